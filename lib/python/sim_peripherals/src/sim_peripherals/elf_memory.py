@@ -10,18 +10,20 @@ class ElfSectionRegion(Region):
     def __init__(self, parent_log: logging.Logger, section : Section) -> None:
         super().__init__(size=section['sh_size'], base=section['sh_addr'])
         self.name = section.name
-        self.log = parent_log.getChild(self.name)
+        self.log = parent_log.getChild(self.name.lstrip(".")) # No leading dot: stay a child of parent_log
         self.is_writable = section['sh_flags'] & SH_FLAGS.SHF_WRITE
         self.data = bytearray(section.data())
 
     async def _read(self, address, length, **kwargs):
         data = self.data[address:address+length]
-        self.log.debug(f"Reading: {hex(self.base + address)} : 0x{binascii.hexlify(data).decode("ascii")}")
+        if self.log.isEnabledFor(logging.DEBUG):
+            self.log.debug(f"Reading: {hex(self.base + address)} : 0x{binascii.hexlify(data).decode("ascii")}")
         return data
 
     async def _write(self, address, data, **kwargs):
         #if self.is_writable:
-        self.log.info(f"Writing: {hex(self.base + address)} : 0x{binascii.hexlify(data).decode("ascii")}")
+        if self.log.isEnabledFor(logging.INFO):
+            self.log.info(f"Writing: {hex(self.base + address)} : 0x{binascii.hexlify(data).decode("ascii")}")
         self.data[address:address+len(data)] = data
         #else:
         #    raise Exception(f"Section {self.name} is not writable (Write attempt at {hex(self.base + address)})")
@@ -34,6 +36,8 @@ class ElfMemory(AddressSpace):
 
         self.log.info(f"****** ELF Memory loaded ({elf_path}) ******")
 
+        self.exec_sections = [] # (start, end) of executable sections
+
         with open(elf_path, 'rb') as file_handler:
             elf_file = ELFFile(file_handler)
 
@@ -45,9 +49,19 @@ class ElfMemory(AddressSpace):
                 if section['sh_flags'] & SH_FLAGS.SHF_ALLOC:
                     elf_region = ElfSectionRegion(self.log, section)
                     self.register_region(elf_region, base=elf_region.base)
+                    if section['sh_flags'] & SH_FLAGS.SHF_EXECINSTR:
+                        self.exec_sections.append((elf_region.base, elf_region.base + elf_region.size))
                     self.log.info(f"* {section.name:10} - base: 0x{hex(section['sh_addr'])}, size:{section['sh_size']}.")
                 else:
                     self.log.info(f"* {section.name:10} - not loaded.")
 
+            # Symbols are used to resolve addresses (e.g. waveform capture windows).
+            self.symbols = {}
+            symtab = elf_file.get_section_by_name(".symtab")
+            if symtab is not None:
+                for symbol in symtab.iter_symbols():
+                    if symbol.name:
+                        self.symbols[symbol.name] = (symbol['st_value'], symbol['st_size'])
+
         self.log.info(f"************")
 
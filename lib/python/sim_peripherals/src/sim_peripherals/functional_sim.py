@@ -0,0 +1,427 @@
+import time
+import cocotb
+from cocotbext.axi.address_space import AddressSpace
+
+from sim_peripherals.halt_peripheral import *
+
+MASK32 = 0xFFFF_FFFF
+
+# Maximum number of instructions decoded in a single basic block.
+BASIC_BLOCK_MAX_LEN = 64
+
+OPCODE_LOAD     = 0b0000011
+OPCODE_MISC_MEM = 0b0001111
+OPCODE_OP_IMM   = 0b0010011
+OPCODE_AUIPC    = 0b0010111
+OPCODE_STORE    = 0b0100011
+OPCODE_OP       = 0b0110011
+OPCODE_LUI      = 0b0110111
+OPCODE_BRANCH   = 0b1100011
+OPCODE_JALR     = 0b1100111
+OPCODE_JAL      = 0b1101111
+OPCODE_SYSTEM   = 0b1110011
+
+INST_WFI = 0x1050_0073
+
+# Read-only CSR (values from pkg_lagarisc.vhd)
+CSR_RO_VALUES = {
+    0xF11 : 0x0000_0000, # mvendorid
+    0xF12 : 0x4C41_4741, # marchid ("LAGA")
+    0xF13 : 0x0000_0000, # mimpid
+    0xF14 : 0x0000_0000, # mhartid
+}
+
+# Read-write CSR (lagarisc_csr.vhd): mstatus, misa, mie, mtvec, mscratch, mepc, mcause, mtval, mip
+CSR_RW_IDS = (0x300, 0x301, 0x304, 0x305, 0x340, 0x341, 0x342, 0x343, 0x344)
+
+CSR_OPCODE_READ  = 0b00
+CSR_OPCODE_WRITE = 0b01
+CSR_OPCODE_SET   = 0b10
+CSR_OPCODE_CLEAR = 0b11
+
+
+def sign_extend(value : int, bits : int) -> int:
+    sign = 1 << (bits - 1)
+    return ((value & ((1 << bits) - 1)) ^ sign) - sign
+
+def to_signed(value : int) -> int:
+    return value - (1 << 32) if value & 0x8000_0000 else value
+
+def run_sync(coro):
+    """Drive a memory coroutine to completion without the cocotb scheduler.
+
+    Memory models only await other memory models, so they complete on the first step.
+    """
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    coro.close()
+    raise Exception("Memory access awaited a simulator trigger (not supported by the functional simulator).")
+
+
+class ProcessorHalted(Exception):
+    def __init__(self, pc : int) -> None:
+        super().__init__(f"Processor halted at {hex(pc)}")
+        self.pc = pc
+
+class BasicBlock:
+    __slots__ = ("start", "end", "ops", "terminator")
+
+    def __init__(self, start : int, end : int, ops : list, terminator) -> None:
+        self.start = start          # Address of the first instruction
+        self.end = end              # Address following the last instruction
+        self.ops = ops              # Straight-line operations (x0 writes dropped)
+        self.terminator = terminator # Last operation, returns the next pc
+
+    @property
+    def length(self) -> int:
+        return (self.end - self.start) // 4
+
+
+class FunctionalSim:
+    """Cycle-free RV32I simulator running an ELF on the simulation peripherals.
+
+    Instructions are decoded once into basic blocks of closures, which are cached by
+    start address and then executed until the halt peripheral is triggered.
+    """
+    def __init__(self, mem : AddressSpace, entry : int, halt : HaltPeripheral = None) -> None:
+        self.log = cocotb.log.getChild("functional_sim")
+        self.mem = mem
+        self.halt = halt
+
+        self.regs = [0] * 32
+        self.csrs = {csr_id : 0 for csr_id in CSR_RW_IDS}
+        self.pc = entry
+
+        # Blocks do not run past the end of executable sections (e.g. into data after .text).
+        self.exec_sections = getattr(mem, "exec_sections", [])
+
+        self.blocks = {}
+        self.code_lo = MASK32
+        self.code_hi = 0
+
+        self.instret = 0
+        self.elapsed = 0.0
+
+    @property
+    def instructions_per_second(self) -> float:
+        return self.instret / self.elapsed if self.elapsed > 0 else 0.0
+
+    # ======================================
+    # == Memory accesses
+    # ======================================
+
+    def load(self, address : int, length : int, pc : int) -> int:
+        try:
+            data = run_sync(self.mem.read(address, length))
+        except Exception as e:
+            raise Exception(f"Load access fault at {hex(address)} (pc = {hex(pc)})") from e
+        return int.from_bytes(data, "little")
+
+    def store(self, address : int, length : int, value : int, pc : int) -> None:
+        try:
+            run_sync(self.mem.write(address, value.to_bytes(length, "little")))
+        except Exception as e:
+            raise Exception(f"Store access fault at {hex(address)} (pc = {hex(pc)})") from e
+
+        if self.code_lo <= address < self.code_hi:
+            self.invalidate(address, length)
+
+        if self.halt is not None and self.halt.processor_halt_event.is_set():
+            raise ProcessorHalted(pc)
+
+    def invalidate(self, address : int, length : int) -> None:
+        """Drop cached blocks overlapping a written range (self-modifying code)."""
+        for start in [s for s, b in self.blocks.items() if b.start < address + length and address < b.end]:
+            self.log.debug(f"Invalidating block at {hex(start)}")
+            del self.blocks[start]
+
+    # ======================================
+    # == Decoding
+    # ======================================
+
+    def block_limit(self, start : int) -> int:
+        limit = start + 4 * BASIC_BLOCK_MAX_LEN
+        for section_start, section_end in self.exec_sections:
+            if section_start <= start < section_end:
+                return min(limit, section_end)
+        return limit
+
+    def build_block(self, start : int) -> BasicBlock:
+        ops = []
+        pc = start
+        limit = self.block_limit(start)
+        while True:
+            try:
+                inst = self.load(pc, 4, pc)
+            except Exception as e:
+                terminator = self.decode_fault(pc, f"Instruction fetch fault at {hex(pc)}", e)
+                break
+
+            op, is_terminator = self.decode(pc, inst)
+            if is_terminator:
+                terminator = op
+                pc += 4
+                break
+
+            if op is not None:
+                ops.append(op)
+            pc += 4
+
+            if pc >= limit:
+                end = pc
+                terminator = lambda: end
+                break
+
+        block = BasicBlock(start, max(pc, start + 4), ops, terminator)
+        self.blocks[start] = block
+        self.code_lo = min(self.code_lo, block.start)
+        self.code_hi = max(self.code_hi, block.end)
+        return block
+
+    def decode_fault(self, pc : int, msg : str, cause : Exception = None):
+        def op():
+            raise Exception(msg) from cause
+        return op
+
+    def decode(self, pc : int, inst : int):
+        """Decode an instruction into a closure.
+
+        Returns (op, is_terminator). Terminators return the next pc, other operations return
+        nothing. `op` is None for instructions without effects (e.g. writes to x0).
+        """
+        regs = self.regs
+        load = self.load
+        store = self.store
+
+        opcode = inst & 0x7F
+        rd     = (inst >> 7) & 0x1F
+        funct3 = (inst >> 12) & 0x7
+        rs1    = (inst >> 15) & 0x1F
+        rs2    = (inst >> 20) & 0x1F
+        funct7 = inst >> 25
+
+        imm_i = sign_extend(inst >> 20, 12)
+        next_pc = (pc + 4) & MASK32
+
+        illegal = self.decode_fault(pc, f"Illegal instruction {inst:#010x} at {hex(pc)}"), True
+
+        if opcode == OPCODE_LUI:
+            if rd == 0:
+                return None, False
+            value = inst & 0xFFFF_F000
+            def op(): regs[rd] = value
+            return op, False
+
+        if opcode == OPCODE_AUIPC:
+            if rd == 0:
+                return None, False
+            value = (pc + (inst & 0xFFFF_F000)) & MASK32
+            def op(): regs[rd] = value
+            return op, False
+
+        if opcode == OPCODE_JAL:
+            imm = sign_extend(((inst >> 31) & 0x1) << 20 | ((inst >> 12) & 0xFF) << 12 |
+                              ((inst >> 20) & 0x1) << 11 | ((inst >> 21) & 0x3FF) << 1, 21)
+            target = (pc + imm) & MASK32
+            if rd == 0:
+                return (lambda: target), True
+            def op():
+                regs[rd] = next_pc
+                return target
+            return op, True
+
+        if opcode == OPCODE_JALR:
+            if funct3 != 0:
+                return illegal
+            def op():
+                target = (regs[rs1] + imm_i) & 0xFFFF_FFFE
+                if rd:
+                    regs[rd] = next_pc
+                return target
+            return op, True
+
+        if opcode == OPCODE_BRANCH:
+            imm = sign_extend(((inst >> 31) & 0x1) << 12 | ((inst >> 7) & 0x1) << 11 |
+                              ((inst >> 25) & 0x3F) << 5 | ((inst >> 8) & 0xF) << 1, 13)
+            target = (pc + imm) & MASK32
+            if funct3 == 0b000:   # BEQ
+                def op(): return target if regs[rs1] == regs[rs2] else next_pc
+            elif funct3 == 0b001: # BNE
+                def op(): return target if regs[rs1] != regs[rs2] else next_pc
+            elif funct3 == 0b100: # BLT
+                def op(): return target if to_signed(regs[rs1]) < to_signed(regs[rs2]) else next_pc
+            elif funct3 == 0b101: # BGE
+                def op(): return target if to_signed(regs[rs1]) >= to_signed(regs[rs2]) else next_pc
+            elif funct3 == 0b110: # BLTU
+                def op(): return target if regs[rs1] < regs[rs2] else next_pc
+            elif funct3 == 0b111: # BGEU
+                def op(): return target if regs[rs1] >= regs[rs2] else next_pc
+            else:
+                return illegal
+            return op, True
+
+        if opcode == OPCODE_LOAD:
+            if funct3 not in (0b000, 0b001, 0b010, 0b100, 0b101):
+                return illegal
+            length = 1 << (funct3 & 0x3)
+            is_signed = not (funct3 & 0x4) and length < 4
+            def op():
+                value = load((regs[rs1] + imm_i) & MASK32, length, pc)
+                if is_signed:
+                    value = sign_extend(value, length * 8) & MASK32
+                if rd:
+                    regs[rd] = value
+            return op, False
+
+        if opcode == OPCODE_STORE:
+            if funct3 > 0b010:
+                return illegal
+            length = 1 << funct3
+            mask = (1 << (length * 8)) - 1
+            imm = sign_extend((inst >> 25) << 5 | rd, 12)
+            def op(): store((regs[rs1] + imm) & MASK32, length, regs[rs2] & mask, pc)
+            return op, False
+
+        if opcode == OPCODE_OP_IMM:
+            shamt = rs2
+            if funct3 == 0b001 and funct7 != 0:
+                return illegal
+            if funct3 == 0b101 and funct7 not in (0b0000000, 0b0100000):
+                return illegal
+            if rd == 0:
+                return None, False
+            uimm = imm_i & MASK32
+            if funct3 == 0b000:   # ADDI
+                def op(): regs[rd] = (regs[rs1] + imm_i) & MASK32
+            elif funct3 == 0b010: # SLTI
+                def op(): regs[rd] = int(to_signed(regs[rs1]) < imm_i)
+            elif funct3 == 0b011: # SLTIU
+                def op(): regs[rd] = int(regs[rs1] < uimm)
+            elif funct3 == 0b100: # XORI
+                def op(): regs[rd] = regs[rs1] ^ uimm
+            elif funct3 == 0b110: # ORI
+                def op(): regs[rd] = regs[rs1] | uimm
+            elif funct3 == 0b111: # ANDI
+                def op(): regs[rd] = regs[rs1] & uimm
+            elif funct3 == 0b001: # SLLI
+                def op(): regs[rd] = (regs[rs1] << shamt) & MASK32
+            elif funct7 == 0:     # SRLI
+                def op(): regs[rd] = regs[rs1] >> shamt
+            else:                 # SRAI
+                def op(): regs[rd] = (to_signed(regs[rs1]) >> shamt) & MASK32
+            return op, False
+
+        if opcode == OPCODE_OP:
+            if funct7 not in (0b0000000, 0b0100000) or (funct7 and funct3 not in (0b000, 0b101)):
+                return illegal
+            if rd == 0:
+                return None, False
+            if funct3 == 0b000 and funct7 == 0:   # ADD
+                def op(): regs[rd] = (regs[rs1] + regs[rs2]) & MASK32
+            elif funct3 == 0b000:                 # SUB
+                def op(): regs[rd] = (regs[rs1] - regs[rs2]) & MASK32
+            elif funct3 == 0b001:                 # SLL
+                def op(): regs[rd] = (regs[rs1] << (regs[rs2] & 0x1F)) & MASK32
+            elif funct3 == 0b010:                 # SLT
+                def op(): regs[rd] = int(to_signed(regs[rs1]) < to_signed(regs[rs2]))
+            elif funct3 == 0b011:                 # SLTU
+                def op(): regs[rd] = int(regs[rs1] < regs[rs2])
+            elif funct3 == 0b100:                 # XOR
+                def op(): regs[rd] = regs[rs1] ^ regs[rs2]
+            elif funct3 == 0b101 and funct7 == 0: # SRL
+                def op(): regs[rd] = regs[rs1] >> (regs[rs2] & 0x1F)
+            elif funct3 == 0b101:                 # SRA
+                def op(): regs[rd] = (to_signed(regs[rs1]) >> (regs[rs2] & 0x1F)) & MASK32
+            elif funct3 == 0b110:                 # OR
+                def op(): regs[rd] = regs[rs1] | regs[rs2]
+            else:                                 # AND
+                def op(): regs[rd] = regs[rs1] & regs[rs2]
+            return op, False
+
+        if opcode == OPCODE_MISC_MEM:
+            return None, False # FENCE: memory is always coherent here.
+
+        if opcode == OPCODE_SYSTEM and inst == INST_WFI:
+            # No interrupt source: the processor would wait forever (e.g. parked after a panic).
+            return self.decode_fault(pc, f"WFI without interrupt source at {hex(pc)} (processor parked)"), True
+
+        if opcode == OPCODE_SYSTEM:
+            if funct3 == 0b000:
+                return None, False # ECALL, EBREAK, xRET: no traps on the core, executed as NOPs.
+            return self.decode_csr(inst, rd, funct3, rs1), False
+
+        return illegal
+
+    def decode_csr(self, inst : int, rd : int, funct3 : int, rs1 : int):
+        """Decode a CSR access the way lagarisc_csr.vhd executes it.
+
+        Read-only CSR ignore writes, unknown CSR read as 0 and do not write RD.
+        """
+        regs = self.regs
+        csrs = self.csrs
+        csr_id = inst >> 20
+        csr_opcode = funct3 & 0x3
+        is_imm = funct3 & 0x4
+
+        if csr_id in CSR_RO_VALUES:
+            if rd == 0:
+                return None
+            value = CSR_RO_VALUES[csr_id]
+            def op(): regs[rd] = value
+            return op
+
+        if csr_id not in csrs:
+            return None
+
+        def op():
+            old = csrs[csr_id]
+            src = rs1 if is_imm else regs[rs1]
+            if csr_opcode == CSR_OPCODE_WRITE:
+                csrs[csr_id] = src
+            elif csr_opcode == CSR_OPCODE_SET:
+                csrs[csr_id] = old | src
+            elif csr_opcode == CSR_OPCODE_CLEAR:
+                csrs[csr_id] = old & ~src & MASK32
+            if rd:
+                regs[rd] = old
+        return op
+
+    # ======================================
+    # == Execution
+    # ======================================
+
+    def run(self, max_instructions : int = None) -> bool:
+        """Run until the halt peripheral is triggered.
+
+        Returns False if `max_instructions` was reached before the processor halted.
+        """
+        blocks = self.blocks
+        pc = self.pc
+        instret = self.instret
+        halted = False
+        block = None
+
+        start_time = time.perf_counter()
+        try:
+            while max_instructions is None or instret < max_instructions:
+                block = blocks.get(pc)
+                if block is None:
+                    block = self.build_block(pc)
+                for op in block.ops:
+                    op()
+                pc = block.terminator()
+                instret += block.length
+        except ProcessorHalted as e:
+            instret += (e.pc - block.start) // 4 + 1
+            pc = (e.pc + 4) & MASK32
+            halted = True
+        finally:
+            self.elapsed += time.perf_counter() - start_time
+            self.instret = instret
+            self.pc = pc
+
+        self.log.info(f"Executed {self.instret} instructions in {self.elapsed:.3f} s "
+                      f"({self.instructions_per_second:.0f} inst/s, {len(blocks)} blocks decoded).")
+        return halted
@@ -2,7 +2,7 @@ import os
 import cocotb
 import struct
 import binascii
-from cocotb.triggers import Event
+from cocotb.triggers import Event, First, ClockCycles
 from cocotbext.axi.address_space import MemoryInterface
 
 from sim_peripherals.elf_memory import *
@@ -46,7 +46,15 @@ class HaltPeripheral(MemoryInterface):
             print(e)
 
 
-    async def wait_until_halted(self):
+    async def wait_until_halted(self, clk = None, timeout_cycles : int = None):
         self.processor_halt_event.clear()
-        await self.processor_halt_event.wait()
+        if timeout_cycles is None:
+            await self.processor_halt_event.wait()
+        else:
+            if clk is None:
+                raise Exception("A clock is required to count watchdog cycles (timeout_cycles given without clk).")
+            # Watchdog: the software must halt within the given number of cycles.
+            await First(self.processor_halt_event.wait(), ClockCycles(clk, timeout_cycles))
+            if not self.processor_halt_event.is_set():
+                raise Exception(f"Watchdog: processor did not halt after {timeout_cycles} cycles.")
         self.processor_halt_event.clear()
\ No newline at end of file
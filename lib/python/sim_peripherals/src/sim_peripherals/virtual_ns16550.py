@@ -28,7 +28,7 @@ class VirtualNS16550(MemoryInterface):
         else:
             self.file = None
 
-    def _read(self, address, length, **kwargs):
+    async def _read(self, address, length, **kwargs):
         ret_value = 0
 
         if address in UartRegOffset:
@@ -51,7 +51,7 @@ class VirtualNS16550(MemoryInterface):
         return struct.pack("<B", ret_value)
 
 
-    def _write(self, address, data, **kwargs):
+    async def _write(self, address, data, **kwargs):
         self.log.info(f"Writing to UART (addr = {hex(address)}) !")
         if address not in UartRegOffset:
             self.log.warning(f"Unknown access at {hex(address)}.")
@@ -65,7 +65,7 @@ class VirtualNS16550(MemoryInterface):
                 self.putchar(data.decode("ascii")[0])
         else:
             # Write register
-            self.reg_space[address] = int(data[0])
+            self.reg_space[UartRegOffset(address)] = int(data[0])
 
     def putchar(self, char: str):
         if char == '\n':
@@ -0,0 +1,194 @@
+import collections
+import cocotb
+from cocotb import simulator
+from cocotb.triggers import RisingEdge, ClockCycles
+from cocotb.utils import get_sim_time
+
+from sim_peripherals.elf_memory import *
+
+# VHDL std_logic values mapped to VCD states.
+VCD_STATES = str.maketrans("UXZWLH-uxzwlh", "xxzx01xxxzx01")
+
+class WaveCapture:
+    """Record sampled signals to a VCD file, only inside trigger windows.
+
+    Signals are sampled on each rising edge into a ring buffer. The buffer is written out when
+    a window opens (PC range, ELF symbol or cycle range), so `depth` cycles of context precede
+    each window, and when `trigger()` is called on a failure (watchdog, co-simulation mismatch).
+    Outside windows nothing is written, which keeps the file small on long runs. Signals are
+    only read there when `depth` is set; otherwise only the PC is tracked, and cycle windows
+    alone wait for their start without sampling.
+    """
+    def __init__(self, clk, signals : list, path : str = "capture.vcd", depth : int = 0,
+                 pc = None, pc_valid = None) -> None:
+        self.log = cocotb.log.getChild("wave_capture")
+        self.clk = clk
+        self.signals = list(signals)
+        self.path = path
+        self.pc = pc
+        self.pc_valid = pc_valid
+
+        self.pc_ranges = []
+        self.cycle_ranges = []
+
+        self.depth = depth
+        self.ring = collections.deque(maxlen=depth + 1)
+        self.cycle = 0
+        self.last_pc = None
+        self.file = None
+        self.last_values = None
+
+    def add_pc_window(self, start : int, end : int):
+        self.pc_ranges.append((start, end))
+
+    def add_symbol_window(self, mem : ElfMemory, name : str):
+        if name not in mem.symbols:
+            raise Exception(f"Symbol '{name}' not found in elf.")
+        addr, size = mem.symbols[name]
+        self.add_pc_window(addr, addr + max(size, 4))
+
+    def add_cycle_window(self, start : int, end : int):
+        self.cycle_ranges.append((start, end))
+
+    def in_window(self) -> bool:
+        for start, end in self.cycle_ranges:
+            if start <= self.cycle < end:
+                return True
+        if self.last_pc is not None:
+            for start, end in self.pc_ranges:
+                if start <= self.last_pc < end:
+                    return True
+        return False
+
+    def start_soon(self):
+        if self.pc_ranges and (self.pc is None or self.pc_valid is None):
+            raise Exception("PC windows require the pc and pc_valid signals.")
+        cocotb.start_soon(self.sample_core())
+
+    def next_cycle_window(self):
+        starts = [start for start, end in self.cycle_ranges if start > self.cycle]
+        return min(starts) if starts else None
+
+    async def sample_core(self):
+        signals = self.signals
+        ring = self.ring
+        track_pc = bool(self.pc_ranges)
+        # Without history nor PC windows, nothing is needed between cycle windows.
+        skip_idle = self.depth == 0 and not track_pc
+
+        while(1):
+            if skip_idle and not self.in_window():
+                start = self.next_cycle_window()
+                if start is None:
+                    return
+                await ClockCycles(self.clk, start - self.cycle + 1)
+                self.cycle = start
+            else:
+                await RisingEdge(self.clk)
+
+            if track_pc and self.pc_valid.value.is_resolvable and self.pc_valid.value:
+                self.last_pc = int(self.pc.value)
+
+            # Signals are only read when kept: in a window, or as history before a window/failure.
+            active = self.in_window()
+            if active or self.depth:
+                ring.append((get_sim_time("step"), tuple(s.value.binstr for s in signals)))
+            if active:
+                self.flush()
+
+            self.cycle += 1
+
+    def trigger(self, reason : str):
+        """Write the last `depth` cycles (e.g. on a watchdog or co-simulation failure)."""
+        self.log.info(f"Capture triggered ({reason}) at cycle {self.cycle}.")
+        self.flush()
+
+    # ======================================
+    # == VCD output
+    # ======================================
+
+    def flush(self):
+        if self.file is None:
+            self.open()
+
+        # Written samples are dropped so the ring only holds the context of the next window.
+        for time, values in self.ring:
+            self.file.write(f"#{time}\n")
+            for i, value in enumerate(values):
+                if self.last_values is None or self.last_values[i] != value:
+                    self.write_value(i, value)
+            self.last_values = values
+        self.ring.clear()
+
+    def open(self):
+        self.log.info(f"Opening waveform capture {self.path}")
+        self.file = open(self.path, "w")
+        self.file.write(f"$timescale {self.vcd_timescale(simulator.get_precision())} $end\n")
+        self.file.write("$scope module capture $end\n")
+        for i, signal in enumerate(self.signals):
+            self.file.write(f"$var wire {len(signal)} {self.vcd_id(i)} {signal._name} $end\n")
+        self.file.write("$upscope $end\n")
+        self.file.write("$enddefinitions $end\n")
+
+    def write_value(self, index : int, value : str):
+        value = value.translate(VCD_STATES)
+        if len(value) == 1:
+            self.file.write(f"{value}{self.vcd_id(index)}\n")
+        else:
+            self.file.write(f"b{value} {self.vcd_id(index)}\n")
+
+    @staticmethod
+    def vcd_timescale(precision : int) -> str:
+        """Simulator precision (power of 10, e.g. -12) as a VCD timescale (e.g. '1ps')."""
+        exponent = precision - precision % 3
+        unit = {0: "s", -3: "ms", -6: "us", -9: "ns", -12: "ps", -15: "fs"}[exponent]
+        return f"{10 ** (precision - exponent)}{unit}"
+
+    @staticmethod
+    def vcd_id(index : int) -> str:
+        chars = ""
+        index += 1
+        while index:
+            index, rem = divmod(index - 1, 94)
+            chars += chr(33 + rem)
+        return chars
+
+    def close(self):
+        if self.file:
+            self.file.close()
+            self.log.info(f"Waveform capture closed ({self.path}).")
+
+    @staticmethod
+    def from_plusargs(dut, signals : list, mem : ElfMemory = None, path : str = "capture.vcd"):
+        """Build a capture from plusargs, or return None when no window is requested.
+
+        +wave_pc=<start>:<end>[,...]  +wave_symbol=<name>[,...]  +wave_cycles=<start>:<end>[,...]
+        +wave_pre_failure=<cycles>    +wave_file=<path>          +wave_signals=<name>[,...]
+        """
+        plusargs = cocotb.plusargs
+        keys = ("wave_pc", "wave_symbol", "wave_cycles", "wave_pre_failure")
+        if not any(k in plusargs for k in keys):
+            return None
+
+        if "wave_signals" in plusargs:
+            signals = [dut._id(name) for name in plusargs["wave_signals"].split(",")]
+
+        capture = WaveCapture(dut.clk, signals,
+                              path=plusargs.get("wave_file", path),
+                              depth=int(plusargs.get("wave_pre_failure", 0)),
+                              pc=dut.trc_program_counter, pc_valid=dut.trc_valid)
+
+        for window in filter(None, plusargs.get("wave_pc", "").split(",")):
+            start, end = window.split(":")
+            capture.add_pc_window(int(start, 0), int(end, 0))
+
+        for name in filter(None, plusargs.get("wave_symbol", "").split(",")):
+            if mem is None:
+                raise Exception("+wave_symbol requires an elf.")
+            capture.add_symbol_window(mem, name)
+
+        for window in filter(None, plusargs.get("wave_cycles", "").split(",")):
+            start, end = window.split(":")
+            capture.add_cycle_window(int(start, 0), int(end, 0))
+
+        return capture
@@ -9,6 +9,7 @@ from cocotbext.axi.address_space import MemoryInterface
 
 from sim_peripherals.elf_memory import *
 from sim_peripherals.halt_peripheral import *
+from sim_peripherals.wave_capture import *
 
 HALT_PERIPHERAL_BASE_ADDR             = 0xFFFF_FF00
 
@@ -64,7 +65,28 @@ async def riscof_run(dut):
     for i in range(10):
         await RisingEdge(dut.clk)
 
+    # ======================================
+    # == Waveform capture (+wave_* plusargs)
+    # ======================================
+    capture = WaveCapture.from_plusargs(dut, [
+        dut.rst, dut.trc_program_counter, dut.trc_valid,
+        dut.data_axi_awvalid, dut.data_axi_awaddr, dut.data_axi_wvalid, dut.data_axi_wdata,
+        dut.data_axi_arvalid, dut.data_axi_araddr, dut.data_axi_rvalid, dut.data_axi_rdata,
+    ], mem, path=os.path.join(os.path.dirname(sig_path), "capture.vcd")) # One capture per test
+    if capture:
+        capture.start_soon()
+
+    watchdog = cocotb.plusargs.get("watchdog")
+
     cocotb.log.info(f"Running processor until halt request.")
-    await halt.wait_until_halted()
+    try:
+        await halt.wait_until_halted(dut.clk, int(watchdog) if watchdog else None)
+    except Exception as e:
+        if capture:
+            capture.trigger(str(e))
+        raise
+    finally:
+        if capture:
+            capture.close()
     cocotb.log.info(f"Processor halted. Signature dumped to {sig_path}.")
 
@@ -60,6 +60,9 @@ class lagarisc32(pluginTemplate):
         else:
             self.target_run = True
 
+        # Extra plusargs passed to the cocotb bench (e.g. +watchdog, +wave_* waveform capture).
+        self.extra_plusargs = config.get('extra_plusargs', '')
+
         # Return the parameters set above back to RISCOF for further processing.
         return sclass
 
@@ -162,7 +165,7 @@ class lagarisc32(pluginTemplate):
             # echo statement.
             if self.target_run:
                 cocotb_makedir_path = f"{os.path.dirname(__file__)}"
-                simcmd = f"{self.dut_exe} -C {cocotb_makedir_path} SIM_BUILD='{self.work_dir}/sim_build' ELF_PATH='{test_dir}/{elf}' SIG_PATH='{sig_file}'"
+                simcmd = f"{self.dut_exe} -C {cocotb_makedir_path} SIM_BUILD='{self.work_dir}/sim_build' ELF_PATH='{test_dir}/{elf}' SIG_PATH='{sig_file}' EXTRA_PLUSARGS='{self.extra_plusargs}'"
             else:
                 simcmd = 'echo "NO RUN"'
 
@@ -8,6 +8,7 @@ from cocotbext.axi import AxiLiteBus, AxiLiteSlave, AxiLiteSlaveRead, AxiLiteRea
 from sim_peripherals.elf_memory import *
 from sim_peripherals.virtual_ns16550 import *
 from sim_peripherals.halt_peripheral import *
+from sim_peripherals.wave_capture import *
 
 VIRTUAL_NS16550_BASE_ADDR       = 0x1000_0000 # Same offset as QEMU
 HALT_PERIPHERAL_BASE_ADDR       = 0xFFFF_FF00
@@ -54,9 +55,29 @@ async def test_sandbox(dut):
     for i in range(10):
         await RisingEdge(dut.clk)
 
+    # Waveform capture windows (only enabled by +wave_* plusargs)
+    capture = WaveCapture.from_plusargs(dut, [
+        dut.rst, dut.trc_program_counter, dut.trc_valid,
+        dut.inst_axi_arvalid, dut.inst_axi_araddr, dut.inst_axi_rvalid, dut.inst_axi_rdata,
+        dut.data_axi_awvalid, dut.data_axi_awaddr, dut.data_axi_wvalid, dut.data_axi_wdata,
+        dut.data_axi_arvalid, dut.data_axi_araddr, dut.data_axi_rvalid, dut.data_axi_rdata,
+    ], mem)
+    if capture:
+        capture.start_soon()
+
+    watchdog = cocotb.plusargs.get("watchdog")
+
     # Run until software stop the simulation
-    await peripheral_halt.wait_until_halted()
-    peripheral_vuart.close()
+    try:
+        await peripheral_halt.wait_until_halted(dut.clk, int(watchdog) if watchdog else None)
+    except Exception as e:
+        if capture:
+            capture.trigger(str(e))
+        raise
+    finally:
+        if capture:
+            capture.close()
+        peripheral_vuart.close()
 
 
 
@@ -0,0 +1,62 @@
+import os
+import sys
+import logging
+import argparse
+import cocotb
+from elftools.elf.elffile import ELFFile
+
+# Running without a simulator: provide the logger cocotb normally creates.
+logging.basicConfig(level=logging.INFO, format="%(levelname)-8s %(name)-34s %(message)s")
+cocotb.log = logging.getLogger("cocotb")
+
+from sim_peripherals.elf_memory import *
+from sim_peripherals.virtual_ns16550 import *
+from sim_peripherals.halt_peripheral import *
+from sim_peripherals.functional_sim import *
+
+VIRTUAL_NS16550_BASE_ADDR       = 0x1000_0000 # Same offset as QEMU
+HALT_PERIPHERAL_BASE_ADDR       = 0xFFFF_FF00
+
+def main():
+    parser = argparse.ArgumentParser(description="Run a sandbox program on the functional RV32I simulator (no HDL).")
+    parser.add_argument("elf", help="Program to run.")
+    parser.add_argument("--stdout", default="core.stdout.txt", help="File receiving the UART output.")
+    parser.add_argument("--max-instructions", type=int, default=None, help="Abort if the program did not halt after N instructions.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.elf):
+        raise Exception(f"Given elf path '{args.elf}' was not found.")
+
+    with open(args.elf, 'rb') as file_handler:
+        entry = ELFFile(file_handler).header['e_entry']
+
+    # Create a virtual memory based on a elf.
+    mem = ElfMemory(args.elf)
+
+    # Register peripherals
+    peripheral_vuart   = VirtualNS16550(VIRTUAL_NS16550_BASE_ADDR, args.stdout)   # Handle CPU prints
+    peripheral_halt    = HaltPeripheral(HALT_PERIPHERAL_BASE_ADDR)                # Handle simulation aborts
+
+    mem.register_region(peripheral_vuart,     base=VIRTUAL_NS16550_BASE_ADDR)
+    mem.register_region(peripheral_halt,        base=HALT_PERIPHERAL_BASE_ADDR)
+
+    # Disable verbose memory logs (every store is logged)
+    mem.log.setLevel(logging.WARNING)
+
+    # Run until software stop the simulation
+    sim = FunctionalSim(mem, entry, peripheral_halt)
+    try:
+        halted = sim.run(args.max_instructions)
+    except Exception as e:
+        sim.log.error(f"Execution failed: {e}")
+        return 1
+    finally:
+        peripheral_vuart.close()
+
+    if not halted:
+        sim.log.error(f"Processor did not halt after {sim.instret} instructions (pc = {hex(sim.pc)}).")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())